@@ -3,6 +3,13 @@
 
 import pandas as pd
 import os
+import re
+
+# Columns used by the analysis below; everything else in the metadata is skipped at parse time
+USECOLS = ['title', 'abstract', 'publish_time', 'journal', 'source_x', 'authors']
+
+# Title words for the frequency count: letters only, 4+ chars (drops numbers and punctuation like "covid-19.")
+WORD_RE = re.compile(r'\b[a-z]{4,}\b')
 
 print("=== Week 8: CORD-19 Data Exploration ===\n")
 
@@ -10,11 +17,12 @@ print("=== Week 8: CORD-19 Data Exploration ===\n")
 if os.path.exists("metadata.csv"):
     print("Full metadata.csv found. Creating a smaller sample file...")
     try:
-        # Read in chunks and keep only first 5000 rows
-        chunk_iter = pd.read_csv("metadata.csv", chunksize=5000, low_memory=False)
-        sample_df = next(chunk_iter)  # Take the first chunk
-        sample_df.to_csv("metadata_sample.csv", index=False)
-        print("✓ metadata_sample.csv created with first 5000 rows.\n")
+        # Bounded read: only the first 5000 rows (and USECOLS) are parsed
+        sample_df = pd.read_csv("metadata.csv", nrows=5000, usecols=USECOLS,
+                                dtype={'publish_time': 'string'}, low_memory=False)
+        # Parquet keeps the dtypes and is much faster to load than re-parsing CSV text
+        sample_df.to_parquet("metadata_sample.parquet", compression='zstd')
+        print("✓ metadata_sample.parquet created with first 5000 rows.\n")
     except Exception as e:
         print(f"⚠ Error while creating sample: {e}")
         exit()
@@ -22,15 +30,26 @@ else:
     print("⚠ metadata.csv not found, skipping trimming.\n")
 
 # Step 2: Loading the sample file for analysis
-if os.path.exists("metadata_sample.csv"):
+if os.path.exists("metadata_sample.parquet"):
     try:
-        df = pd.read_csv("metadata_sample.csv", low_memory=False)
+        df = pd.read_parquet("metadata_sample.parquet", columns=USECOLS)
         print("✓ Sample dataset loaded successfully.\n")
+    except Exception as e:
+        print(f"⚠ Could not load metadata_sample.parquet: {e}")
+        exit()
+elif os.path.exists("metadata_sample.csv"):
+    # Older CSV sample: load it once and cache it as Parquet for the next runs (and app.py)
+    try:
+        # publish_time is read as text: pyarrow may otherwise infer date32 from an all-"YYYY-MM-DD" first block
+        df = pd.read_csv("metadata_sample.csv", usecols=USECOLS, dtype={'publish_time': 'string'},
+                         engine='pyarrow')
+        df.to_parquet("metadata_sample.parquet", compression='zstd')
+        print("✓ Sample dataset loaded successfully (cached to metadata_sample.parquet).\n")
     except Exception as e:
         print(f"⚠ Could not load metadata_sample.csv: {e}")
         exit()
 else:
-    print("⚠ metadata_sample.csv not found. Please make sure it's in the folder.")
+    print("⚠ metadata_sample.parquet / metadata_sample.csv not found. Please make sure it's in the folder.")
     exit()
 
 # Step 3: Data exploration
@@ -46,8 +65,13 @@ print(df.info(), "\n")
 print("--- Missing Values (Top 10 columns with most missing) ---")
 print(df.isnull().sum().sort_values(ascending=False).head(10), "\n")
 
-print("--- Basic Statistics ---")
-print(df.describe(include="all").transpose().head(10))
+print("--- Basic Statistics (numeric columns) ---")
+# Numeric summaries only: unique/top/freq over the long text columns is expensive and not needed here
+numeric_df = df.select_dtypes(include="number")
+if numeric_df.shape[1] > 0:
+    print(numeric_df.describe().transpose().head(10))
+else:
+    print("No numeric columns in the raw sample (year and abstract_word_count are added in Part 2).")
 
 
 # === Part 2: Data Cleaning & Preparation ===
@@ -59,24 +83,18 @@ missing = df.isnull().sum().sort_values(ascending=False)
 print("\n--- Missing values per column (top 10) ---")
 print(missing.head(10))
 
-# Droping irrelevant or sparse columns (too many NaNs)
-drop_cols = ['sha', 'license', 'pmcid', 'pubmed_id', 
-             'arxiv_id', 'who_covidence_id', 'has_full_text']
-df = df.drop(columns=drop_cols, errors='ignore')
-
-# Fill missing abstracts/titles with placeholder
-df['abstract'] = df['abstract'].fillna("No abstract available")
-df['title'] = df['title'].fillna("No title available")
-
-# 2. Preparing data for analysis
-# Converting publish_time to datetime
-df['publish_time'] = pd.to_datetime(df['publish_time'], errors='coerce')
-
-# Extracting publication year
-df['year'] = df['publish_time'].dt.year
+# Irrelevant or sparse columns (sha, license, pmcid, ...) are never loaded thanks to USECOLS
 
-# Creating abstract word count column
-df['abstract_word_count'] = df['abstract'].apply(lambda x: len(str(x).split()))
+# Fill missing abstracts/titles and derive the analysis columns in a single assign(),
+# so the frame is materialised once instead of being mutated column by column.
+# Only the year of publish_time is used, so it stays a string ("YYYY-MM-DD" or "YYYY")
+# and the year comes from its first 4 characters (no full datetime parse).
+df = df.assign(
+    abstract=lambda d: d['abstract'].fillna("No abstract available"),
+    title=lambda d: d['title'].fillna("No title available"),
+    year=lambda d: pd.to_numeric(d['publish_time'].str.slice(0, 4), errors='coerce').astype('Int16'),
+    abstract_word_count=lambda d: d['abstract'].str.count(r'\S+').astype('int32'),
+)
 
 print("\n--- Cleaned Dataset Info ---")
 print(df.info())
@@ -87,7 +105,6 @@ print(df[['title', 'year', 'abstract_word_count']].head())
 
 import matplotlib.pyplot as plt
 import seaborn as sns
-from collections import Counter
 from wordcloud import WordCloud
 
 print("\n--- Part 3: Data Analysis & Visualization ---")
@@ -121,9 +138,9 @@ plt.savefig("plots/top_journals.png")
 plt.close()
 
 # 3. Word Frequency in Titles
-all_titles = " ".join(df['title'].dropna().astype(str).tolist()).lower()
-words = [w for w in all_titles.split() if len(w) > 3]  # filter short words
-common_words = Counter(words).most_common(20)
+all_titles = df['title'].str.cat(sep=' ', na_rep='').lower()
+tokens = pd.Series(WORD_RE.findall(all_titles), dtype='string')
+common_words = tokens.value_counts().head(20)
 print("\nMost Common Words in Titles:")
 print(common_words)
 
@@ -1,13 +1,18 @@
 """
 app.py
 Simple Streamlit CORD-19 Data Explorer
-Requires: streamlit, pandas, matplotlib, seaborn, wordcloud
+Requires: streamlit>=1.40, pandas>=2.0, pyarrow, matplotlib, seaborn, wordcloud
 Run: streamlit run app.py
 """
 
+import io
 import os
+import threading
 import streamlit as st
+import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # non-interactive backend: we only ever render PNGs
 import matplotlib.pyplot as plt
 import seaborn as sns
 from collections import Counter
@@ -15,31 +20,65 @@ from wordcloud import WordCloud
 
 sns.set(style="whitegrid")
 
+# Only these columns are used by the app; the rest of the metadata is skipped at parse time
+USECOLS = ['title', 'abstract', 'publish_time', 'journal', 'source_x', 'authors']
+
+# Parquet sample written by Week8.py; the CSV sample is used as a fallback
+DATA_PATH = "metadata_sample.parquet"
+CSV_PATH = "metadata_sample.csv"
+
 # ---------- Helpers ----------
 
-def load_data(path="metadata_sample.csv"):
+def load_data(path=DATA_PATH):
     """
-    Load the sample metadata CSV and perform minimal cleaning:
-    - parse publish_time
-    - extract year
+    Load the sample metadata (Parquet, or CSV fallback; only USECOLS) and perform minimal cleaning:
+    - extract year from publish_time
     - fill missing title/abstract
     - keep source_x (if present)
+    Also computes the filter-invariant values the sidebar needs, once per data file.
+    Returns (df, top_journal_list, min_year, max_year, year_hist).
     """
-    df = pd.read_csv(path, low_memory=False)
+    if path.endswith(".parquet"):
+        # Column projection + stored dtypes: no text parsing needed
+        df = pd.read_parquet(path, columns=USECOLS, dtype_backend='pyarrow')
+    else:
+        # publish_time is read as text: pyarrow may otherwise infer date32 from an all-"YYYY-MM-DD" first block
+        df = pd.read_csv(path, usecols=USECOLS, dtype={'publish_time': 'string[pyarrow]'},
+                         engine='pyarrow', dtype_backend='pyarrow')
     # Fill missing title/abstract
     df['title'] = df['title'].fillna("No title available")
     df['abstract'] = df['abstract'].fillna("No abstract available")
-    # Parse publish_time to datetime (coerce invalids to NaT)
+    # Only the year is needed: slice "YYYY..." instead of a full datetime parse (invalids -> NA)
     if 'publish_time' in df.columns:
-        df['publish_time'] = pd.to_datetime(df['publish_time'], errors='coerce')
-        df['year'] = df['publish_time'].dt.year
+        df['year'] = pd.to_numeric(df['publish_time'].str.slice(0, 4), errors='coerce').astype('Int16')
     else:
         df['year'] = pd.NA
 
     # Add a quick numeric column for abstract word count
-    df['abstract_word_count'] = df['abstract'].astype(str).apply(lambda x: len(x.split()))
+    df['abstract_word_count'] = df['abstract'].str.count(r'\S+').astype('int32')
+
+    # Low-cardinality text columns as categoricals: value_counts/isin work on integer codes
+    for c in ('journal', 'source_x'):
+        if c in df.columns:
+            df[c] = df[c].astype('category')
+
+    # Sidebar choices: the 50 most frequent journals of the unfiltered data
+    top_journal_list = df['journal'].value_counts().head(50).index.tolist() if 'journal' in df.columns else []
+
+    years = df['year'].dropna()
+    if len(years) > 0:
+        min_year, max_year = int(years.min()), int(years.max())
+    else:
+        min_year, max_year = 2019, 2022  # fallback values
+
+    # Papers per year of the unfiltered data (year_hist[0] is min_year), one bincount pass.
+    # Without a journal filter the year chart is just a slice of it.
+    if len(years) > 0:
+        year_hist = np.bincount(years.to_numpy(dtype="int64") - min_year)
+    else:
+        year_hist = np.zeros(0, dtype="int64")
 
-    return df
+    return df, top_journal_list, min_year, max_year, year_hist
 
 # Streamlit caching (works with different streamlit versions)
 try:
@@ -53,6 +92,102 @@ except Exception:
         # no caching available; use plain function
         pass
 
+@st.cache_data(max_entries=32)
+def column_counts(_df, column, key):
+    """
+    value_counts() of one column of a (filtered) frame.
+    _df is not hashed by Streamlit; key identifies the filters that produced it.
+    """
+    if column not in _df.columns:
+        return pd.Series(dtype="int64")
+    # Plain NumPy counts: pandas' pie plot can't handle the int64[pyarrow] counts of Arrow-backed columns
+    counts = _df[column].value_counts().astype("int64")
+    # Categorical columns report every category; keep only those present, as plain labels
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(object)
+    return counts
+
+@st.cache_data(max_entries=8)
+def preview(_df, cols, key, n=200):
+    """
+    First n rows of the given columns of a (filtered) frame, for the data preview table.
+    _df is not hashed by Streamlit; key identifies the filters that produced it.
+    """
+    return _df[list(cols)].head(n)
+
+@st.cache_resource
+def reusable_figure(name):
+    """
+    One Figure/Axes pair per chart name, created once and cleared before each redraw.
+    The figure is shared by every session, so it comes with its own lock: the lock has to live
+    in the cached resource too, since app.py is re-executed (with fresh globals) on every rerun.
+    """
+    fig, ax = plt.subplots()
+    return fig, ax, threading.Lock()
+
+def fig_to_png(fig):
+    """Render a matplotlib figure to PNG bytes."""
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight")
+    return buf.getvalue()
+
+@st.cache_data(max_entries=16)
+def year_plot_png(_year_counts, key):
+    """Publications-by-year line chart as PNG bytes (keyed on the filters)."""
+    fig1, ax1, lock = reusable_figure("year")
+    with lock:
+        ax1.clear()
+        fig1.set_size_inches(8, 4)
+        sns.lineplot(x=_year_counts.index, y=_year_counts.values, marker='o', ax=ax1)
+        ax1.set_xlabel("Year")
+        ax1.set_ylabel("Number of papers")
+        ax1.set_title("Publications by Year (filtered)")
+        fig1.tight_layout()
+        return fig_to_png(fig1)
+
+@st.cache_data(max_entries=16)
+def top_journals_plot_png(_top_journals, key, top_n):
+    """Top-N journals bar chart as PNG bytes (keyed on the filters and N)."""
+    fig2, ax2, lock = reusable_figure("journals")
+    with lock:
+        ax2.clear()
+        fig2.set_size_inches(8, 0.5 * top_n + 2)
+        sns.barplot(x=_top_journals.values, y=_top_journals.index, ax=ax2)
+        ax2.set_xlabel("Number of papers")
+        ax2.set_ylabel("Journal")
+        ax2.set_title("Top Journals (filtered)")
+        fig2.tight_layout()
+        return fig_to_png(fig2)
+
+@st.cache_data(max_entries=16)
+def source_plot_png(_source_counts, key):
+    """Source distribution pie chart as PNG bytes (keyed on the filters)."""
+    fig3, ax3, lock = reusable_figure("sources")
+    with lock:
+        ax3.clear()
+        fig3.set_size_inches(6, 6)
+        _source_counts.plot.pie(autopct='%1.1f%%', startangle=90, ax=ax3)
+        ax3.set_ylabel("")
+        ax3.set_title("Top Sources (filtered)")
+        fig3.tight_layout()
+        return fig_to_png(fig3)
+
+@st.cache_data(max_entries=16)
+def wordcloud_png(_titles, key):
+    """
+    Word cloud of the (filtered) titles as PNG bytes, or None if there is no text.
+    Keyed on the filters, so the join + WordCloud layout only run when they change.
+    """
+    all_titles = _titles.str.cat(sep=' ', na_rep='').lower()
+    # Basic cleaning to remove punctuation-like tokens can be added
+    if len(all_titles.strip()) == 0:
+        return None
+    wc = WordCloud(width=800, height=400, background_color="white", max_words=150).generate(all_titles)
+    # PNG straight from the PIL image: far smaller than shipping the raw RGB array
+    buf = io.BytesIO()
+    wc.to_image().save(buf, format="PNG", optimize=True)
+    return buf.getvalue()
+
 # ---------- App layout ----------
 
 st.title("CORD-19 Metadata Explorer")
@@ -62,117 +197,112 @@ st.markdown(
 )
 
 # Check file presence
-DATA_PATH = "metadata_sample.csv"
 if not os.path.exists(DATA_PATH):
-    st.error(f"metadata_sample.csv not found. Put it in the same folder as app.py and re-run.")
-    st.stop()
+    if os.path.exists(CSV_PATH):
+        DATA_PATH = CSV_PATH
+    else:
+        st.error(f"metadata_sample.parquet not found. Run Week8.py (or put metadata_sample.csv in the same folder as app.py) and re-run.")
+        st.stop()
 
 # Load data
 with st.spinner("Loading data..."):
-    df = load_data(DATA_PATH)
+    df, top_journal_list, min_year, max_year, year_hist = load_data(DATA_PATH)
 
 # Quick info for user
 st.sidebar.header("Filters")
-years = df['year'].dropna().astype(int) if 'year' in df.columns else pd.Series(dtype=int)
-if len(years) > 0:
-    min_year, max_year = int(years.min()), int(years.max())
-else:
-    min_year, max_year = 2019, 2022  # fallback values
 
 # Sidebar widgets
 year_range = st.sidebar.slider("Select year range", min_year, max_year, (min_year, max_year))
 top_n = st.sidebar.slider("Top N journals to show", 5, 25, 10)
 
-# Optional journal multi-select limited to top journals
-top_journal_list = df['journal'].value_counts().head(50).index.tolist() if 'journal' in df.columns else []
+# Optional journal multi-select limited to top journals (precomputed in load_data)
 selected_journals = st.sidebar.multiselect("Filter by journals (optional)", top_journal_list, default=[])
 
-# Apply filters
-df_filtered = df.copy()
-# Year filter
-if 'year' in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered['year'].between(year_range[0], year_range[1], inclusive="both")]
+# Apply filters: one boolean mask, one indexing step (df.loc[mask] already returns a new frame)
+mask = np.ones(len(df), dtype=bool)
+# Year filter (missing years never match)
+if 'year' in df.columns:
+    mask &= df['year'].between(year_range[0], year_range[1], inclusive="both").to_numpy(dtype=bool, na_value=False)
 
 # Journal filter (if user chose any)
 if selected_journals:
-    df_filtered = df_filtered[df_filtered['journal'].isin(selected_journals)]
+    mask &= df['journal'].isin(selected_journals).to_numpy(dtype=bool, na_value=False)
+
+df_filtered = df.loc[mask]
+
+# Hashable key describing the current filters; cached helpers key on it instead of hashing df_filtered
+filter_key = (DATA_PATH, tuple(year_range), tuple(selected_journals))
+
+# Per-filter aggregates (cached: only recomputed when the filters change)
+if selected_journals:
+    year_counts = column_counts(df_filtered, 'year', filter_key).sort_index()
+else:
+    # Only the year range applies: slice the precomputed histogram (O(years), not O(rows))
+    lo, hi = year_range
+    hist_slice = year_hist[lo - min_year:hi - min_year + 1]
+    year_counts = pd.Series(hist_slice, index=np.arange(lo, lo + len(hist_slice)))
+    year_counts = year_counts[year_counts > 0]  # same as value_counts(): years without papers are absent
+journal_counts = column_counts(df_filtered, 'journal', filter_key)
+source_counts = column_counts(df_filtered, 'source_x', filter_key).head(10)
 
 # Show basic metrics
 st.subheader("Overview")
 col1, col2, col3 = st.columns(3)
 col1.metric("Total records (sample)", f"{len(df)}")
 col2.metric("Records after filter", f"{len(df_filtered)}")
-unique_journals = int(df_filtered['journal'].nunique()) if 'journal' in df_filtered.columns else 0
+unique_journals = len(journal_counts)  # value_counts() drops NA, same as nunique()
 col3.metric("Unique journals (filtered)", f"{unique_journals}")
 
 # ---------- Visualization 1: Publications by Year ----------
 st.subheader("Publications by Year")
-if 'year' in df_filtered.columns and df_filtered['year'].notna().any():
-    year_counts = df_filtered['year'].value_counts().sort_index()
-    fig1, ax1 = plt.subplots(figsize=(8,4))
-    sns.lineplot(x=year_counts.index, y=year_counts.values, marker='o', ax=ax1)
-    ax1.set_xlabel("Year")
-    ax1.set_ylabel("Number of papers")
-    ax1.set_title("Publications by Year (filtered)")
-    plt.tight_layout()
-    st.pyplot(fig1)
+if len(year_counts) > 0:
+    st.image(year_plot_png(year_counts, filter_key), use_container_width=True)
 else:
     st.info("No valid 'year' values available for plotting.")
 
 # ---------- Visualization 2: Top Journals ----------
 st.subheader(f"Top {top_n} Journals")
-if 'journal' in df_filtered.columns and df_filtered['journal'].notna().any():
-    top_journals = df_filtered['journal'].value_counts().head(top_n)
-    fig2, ax2 = plt.subplots(figsize=(8, 0.5 * top_n + 2))
-    sns.barplot(x=top_journals.values, y=top_journals.index, ax=ax2)
-    ax2.set_xlabel("Number of papers")
-    ax2.set_ylabel("Journal")
-    ax2.set_title("Top Journals (filtered)")
-    plt.tight_layout()
-    st.pyplot(fig2)
+if len(journal_counts) > 0:
+    top_journals = journal_counts.head(top_n)
+    st.image(top_journals_plot_png(top_journals, filter_key, top_n), use_container_width=True)
 else:
     st.info("No journal information available to display.")
 
 # ---------- Visualization 3: Word Cloud of Titles ----------
 st.subheader("Word Cloud of Titles")
-all_titles = " ".join(df_filtered['title'].dropna().astype(str).tolist()).lower()
-# Basic cleaning to remove punctuation-like tokens can be added
-if len(all_titles.strip()) > 0:
-    wc = WordCloud(width=800, height=400, background_color="white", max_words=150).generate(all_titles)
-    st.image(wc.to_array(), use_column_width=True)
+wc_png = wordcloud_png(df_filtered['title'], filter_key)
+if wc_png is not None:
+    st.image(wc_png, use_container_width=True)
 else:
     st.info("No title text available to generate a word cloud.")
 
 # ---------- Visualization 4: Distribution by Source (if present) ----------
 st.subheader("Distribution by Source (top sources)")
-if 'source_x' in df_filtered.columns and df_filtered['source_x'].notna().any():
-    source_counts = df_filtered['source_x'].value_counts().head(10)
-    fig3, ax3 = plt.subplots(figsize=(6,6))
-    source_counts.plot.pie(autopct='%1.1f%%', startangle=90, ax=ax3)
-    ax3.set_ylabel("")
-    ax3.set_title("Top Sources (filtered)")
-    plt.tight_layout()
-    st.pyplot(fig3)
+if len(source_counts) > 0:
+    st.image(source_plot_png(source_counts, filter_key), use_container_width=True)
 else:
     st.info("No 'source_x' column available in this dataset sample.")
 
 # ---------- Data preview and download ----------
 st.subheader("Data Preview")
 cols_to_show = ['title', 'authors', 'journal', 'year'] if all(c in df_filtered.columns for c in ['title','authors','journal','year']) else df_filtered.columns[:5]
-st.dataframe(df_filtered[cols_to_show].head(200))
+
+st.dataframe(preview(df_filtered, tuple(cols_to_show), filter_key))
 
 # Provide optional CSV download of filtered sample
-@st.experimental_memo
-def convert_df_to_csv(d):
-    return d.to_csv(index=False).encode('utf-8')
+@st.cache_data(max_entries=8)
+def convert_df_to_csv(_d, cols, key):
+    # _d is not hashed by Streamlit; key (filters) + cols identify its content.
+    # Columns are selected here so cache hits don't copy df_filtered[cols] on every rerun.
+    return _d[list(cols)].to_csv(index=False).encode('utf-8')
 
-csv_bytes = convert_df_to_csv(df_filtered[cols_to_show])
+csv_bytes = convert_df_to_csv(df_filtered, tuple(cols_to_show), filter_key)
 st.download_button("Download filtered data (CSV)", data=csv_bytes, file_name="filtered_metadata_sample.csv", mime="text/csv")
 
 # ---------- Footer: short guidance ----------
 st.markdown("---")
 st.markdown(
     "Notes:\n"
-    "- This app uses a local 'metadata_sample.csv' file. For larger full dataset processing use chunking or a database.\n"
+    "- This app uses a local 'metadata_sample.parquet' (or 'metadata_sample.csv') file. For larger full dataset processing use chunking or a database.\n"
     "- The word cloud and plots reflect the current filters in the sidebar."
 )